@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
 import re
 import os
+import functools
+import json
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from getpass import getpass
-import pandas as pd
+import openpyxl
+import xlsxwriter
 from netmiko import ConnectHandler
 from netmiko.ssh_autodetect import SSHDetect
-from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException, ReadTimeout
+from netmiko.utilities import get_template_dir
+import textfsm
+from textfsm import clitable
 from colorama import Fore, Style, init
 
 try:
@@ -14,6 +27,9 @@ try:
 except Exception:
     NAPALM_AVAILABLE = False
 
+# per-device progress goes through logging: records from worker threads don't interleave mid-line
+log = logging.getLogger(__name__)
+
 COMMANDS = {
     'cisco_ios': {
         'interfaces': 'show ip interface brief',
@@ -45,7 +61,73 @@ COMMANDS = {
     }
 }
 
+# Collection is I/O bound (SSH round-trips), so switches are polled in parallel.
+MAX_WORKERS = 16
+
+# Upper bound for a single show command; slow devices get a longer read window instead of a global delay factor
+COMMAND_READ_TIMEOUT = 30
+
+# A batched read gives up after this long without any new data (seconds), the commands are then sent one by one
+BATCH_IDLE_TIMEOUT = 5
+
+# Netmiko sessions idle longer than this are closed by the pool reaper (seconds)
+SESSION_IDLE_TIMEOUT = 600
+# SSH keepalive interval of pooled sessions (seconds), so an idle pooled session isn't dropped by the switch / a firewall
+SESSION_KEEPALIVE = 30
+
+# SSHDetect results are kept between runs (ip -> [device_type, detected_at]); older entries are detected again
+PLATFORM_CACHE_PATH = os.path.expanduser('~/.pymapper_platforms.json')
+PLATFORM_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Excel sheets -> column order / dedup keys
+SHEET_COLUMNS = {
+    'Interface_Information': ['Hostname', 'Port', 'Description', 'Vlan', 'Status', 'Protocol', 'Ip_address', 'Etherchannel'],
+    'VLAN_List': ['Hostname', 'Vlan_id', 'Vlan Name', 'Atanan_portlar'],
+}
+SHEET_KEYS = {
+    'Interface_Information': ['Hostname', 'Port'],
+    'VLAN_List': ['Hostname', 'Vlan_id'],
+}
+# The store keeps every value as TEXT; these columns get their native type back in the workbook,
+# so vlan ids sort/filter as numbers and napalm's is_enabled is a real TRUE/FALSE again.
+EXPORT_TYPES = {
+    'Vlan_id': lambda v: int(v) if v and v.isdecimal() else v,
+    'Protocol': lambda v: {'True': True, 'False': False}.get(v, v),
+}
+# Excel sheet -> sqlite table of the store
+SHEET_TABLES = {
+    'Interface_Information': 'arayuz',
+    'VLAN_List': 'vlan',
+}
+
+def new_columns(sheet):
+    """Empty {column: []} store for a sheet; rows are appended column-wise."""
+    return {col: [] for col in SHEET_COLUMNS[sheet]}
+
 # ------------------ interface normalize (daha esnek) --------------------------
+# common short names -> long form, keys lower-case for case-insensitive lookup.
+# Longest key first, so the startswith fallback prefers GigabitEthernet over Gi deterministically.
+IFACE_PREFIXES = {k.lower(): v for k, v in sorted({
+    'Gi': 'GigabitEthernet', 'GigabitEthernet': 'GigabitEthernet',
+    'Fa': 'FastEthernet', 'FastEthernet': 'FastEthernet',
+    'Eth': 'Ethernet', 'Ethernet': 'Ethernet',
+    'Te': 'TenGigabitEthernet', 'Port-channel': 'Port-channel',
+    'Po': 'Port-channel', 'ae': 'ae', 'ge': 'ge', 'xe': 'xe'
+}.items(), key=lambda kv: len(kv[0]), reverse=True)}
+IFACE_PREFIX_KEYS = tuple(IFACE_PREFIXES)  # same order, for a single str.startswith(tuple) test
+
+# One-pass text replacements (aliases expanded, '.' -> '/'), longest key first. Long names map to
+# themselves so an alias is never expanded inside them (TwoGigabitEthernet must not become
+# TwoGigabitEthernetgabitEthernet); like 'Ethernet ' they also drop a following space.
+IFACE_SUBS = {'Ethernet ': 'Ethernet', 'Gi': 'GigabitEthernet', 'Fa': 'FastEthernet',
+              'Te': 'TenGigabitEthernet', 'Po': 'Port-channel', '.': '/'}
+for _name in ('TenGigabitEthernet', 'GigabitEthernet', 'FastEthernet', 'Port-channel'):
+    IFACE_SUBS[_name] = IFACE_SUBS[_name + ' '] = _name
+IFACE_SUB_RE = re.compile('|'.join(map(re.escape, sorted(IFACE_SUBS, key=len, reverse=True))))
+
+# prefix (letters and punctuation) + numeric part
+IFACE_RE = re.compile(r'^(?P<prefix>[A-Za-z\-\_\/]*[A-Za-z]+)?\s*(?P<num>[\d\/\.\:]+.*)$')
+
 def normalize_interface_names(ifname: str, vendor: str = None) -> str:
     """
     Daha genel bir normalizasyon:
@@ -55,34 +137,33 @@ def normalize_interface_names(ifname: str, vendor: str = None) -> str:
     """
     if not ifname or not isinstance(ifname, str):
         return ifname
+    return _normalize_interface_name(ifname, vendor)
 
+# Pure function of (ifname, vendor) and the same port names repeat across every table, so results are memoized.
+@functools.lru_cache(maxsize=4096)
+def _normalize_interface_name(ifname, vendor):
     s = ifname.strip()
 
-    # common replacements
-    s = s.replace('Ethernet ', 'Ethernet').replace('Gi', 'GigabitEthernet').replace('Fa', 'FastEthernet')
-    s = s.replace('Te', 'TenGigabitEthernet').replace('Po', 'Port-channel').replace('Port-channel', 'Port-channel')
-    # normalize common junos style like ge-0/0/0 -> keep as is but unify separators
-    s = s.replace('.', '/')
+    # common replacements in a single pass; also junos style like ge-0/0/0.0 -> unify separators
+    s = IFACE_SUB_RE.sub(lambda m: IFACE_SUBS[m.group(0)], s)
 
     # Try match: prefix (letters and punctuation) + numeric part
-    m = re.match(r'^(?P<prefix>[A-Za-z\-\_\/]*[A-Za-z]+)?\s*(?P<num>[\d\/\.\:]+.*)$', s)
+    m = IFACE_RE.match(s)
     if m:
         prefix = (m.group('prefix') or '').strip()
         num = (m.group('num') or '').strip()
-        # map some common short names
-        mapping = {
-            'Gi': 'GigabitEthernet', 'GigabitEthernet': 'GigabitEthernet',
-            'Fa': 'FastEthernet', 'FastEthernet': 'FastEthernet',
-            'Eth': 'Ethernet', 'Ethernet': 'Ethernet',
-            'Te': 'TenGigabitEthernet', 'Port-channel': 'Port-channel',
-            'Po': 'Port-channel', 'ae': 'ae', 'ge': 'ge', 'xe': 'xe', 'ae': 'ae'
-        }
-        # try to find a mapping key that matches the prefix (case-insensitive)
-        for k, v in mapping.items():
-            if prefix.lower().startswith(k.lower()):
-                return f"{v}{num}"
+        # exact short/long name hit is a single dict lookup
+        prefix_lower = prefix.lower()
+        canonical = IFACE_PREFIXES.get(prefix_lower)
+        if canonical is None and prefix_lower.startswith(IFACE_PREFIX_KEYS):
+            # otherwise the longest mapping key that the prefix starts with (ex: Gig -> GigabitEthernet);
+            # unknown prefixes are ruled out by the one C-level startswith above without walking the map
+            canonical = next(v for k, v in IFACE_PREFIXES.items() if prefix_lower.startswith(k))
+        if canonical:
+            return f"{canonical}{num}"
         # default: if prefix empty and num like 1/1/1 -> assume Ethernet on many vendors
-        if not prefix and re.match(r'^[\d]+(\/[\d]+)*', num):
+        # (a ^\d+(/\d+)* match only needs a leading digit, so a plain char test is enough)
+        if not prefix and num[:1].isdecimal():
             # vendor-specific default can be improved
             if vendor and 'juniper' in vendor:
                 return f"ge-{num}"
@@ -114,27 +195,315 @@ def display_banner():
     print(tagline_color + tagline)
     print("\n" + "=" * 75 + "\n")
 
+# (platform, command) -> compiled TextFSM (None: no template). netmiko's use_textfsm re-reads the
+# ntc-templates index and recompiles the template on every send_command; here it happens once per process.
+_TEXTFSM_CACHE = {}
+_TEXTFSM_LOCK = threading.Lock()   # a TextFSM object keeps parse state, so one parse at a time
+_textfsm_index = None
+
+def get_textfsm(platform, command):
+    """Compiled TextFSM for (platform, command), None if there is no usable template. Misses are cached too."""
+    global _textfsm_index
+    key = (platform, command)
+    if key not in _TEXTFSM_CACHE:
+        fsm = None
+        try:
+            if _textfsm_index is None:
+                template_dir = get_template_dir()
+                _textfsm_index = (clitable.CliTable('index', template_dir), template_dir)
+            cli_table, template_dir = _textfsm_index
+            row = cli_table.index.GetRowMatch({'Platform': platform, 'Command': command})
+            if row:
+                template_file = cli_table.index.index[row]['Template'].split(':')[0].strip()
+                with open(os.path.join(template_dir, template_file)) as f:
+                    fsm = textfsm.TextFSM(f)
+        except Exception as e:
+            # a broken/missing template would otherwise be re-read and fail again on every parse
+            log.debug("no usable TextFSM template for %s '%s': %s", platform, command, e)
+        _TEXTFSM_CACHE[key] = fsm
+    return _TEXTFSM_CACHE[key]
+
+def parse_output(platform, command, raw):
+    """TextFSM parse of a raw command output; returns the raw text if there is no template / parsing fails."""
+    try:
+        with _TEXTFSM_LOCK:
+            fsm = get_textfsm(platform, command)
+            if fsm is None:
+                return raw
+            fsm.Reset()
+            rows = fsm.ParseText(raw)
+            header = [h.lower() for h in fsm.header]
+    except Exception:
+        return raw
+    # same shape as netmiko's use_textfsm output: list of dicts with lower-case keys
+    return [dict(zip(header, r)) for r in rows] or raw
+
+def first_of(row, keys):
+    """row.get(k1) or row.get(k2) or ... -- field names differ between vendor templates."""
+    value = None
+    for k in keys:
+        value = row.get(k)
+        if value:
+            break
+    return value
+
+def switchport_vlan(sw):
+    """Vlan text of a switchport row, None if the row has no usable vlan info."""
+    mode = (sw.get('mode') or '').lower()
+    if 'access' in mode:
+        return f"Access({sw.get('access_vlan','')})"
+    if 'trunk' in mode:
+        return f"Trunk({sw.get('trunk_vlans','')})"
+    # hp/aruba templates may have different keys - try a few
+    return sw.get('vlan') or None
+
+def send_batched(net_connect, commands, prompt):
+    """
+    Writes all commands to the channel at once and reads until the prompt has come back once per command,
+    so the whole batch costs about one round-trip instead of one per command.
+    Returns {command: raw output}, or None if the buffer can't be split cleanly per command.
+    Raises ReadTimeout if the prompt doesn't come back often enough (ex: the device dropped the typed-ahead input):
+    after BATCH_IDLE_TIMEOUT seconds without new data, so a failed batch wastes seconds instead of minutes.
+    In both cases part of the batch may still be unread, the caller has to resync the channel before reusing it.
+    """
+    net_connect.clear_buffer()
+    net_connect.write_channel(''.join(net_connect.normalize_cmd(cmd) for cmd in commands))
+    # read_until_pattern() would re-search the whole buffer with a multi-prompt regex on every read,
+    # which is quadratic in the output size; here only the newly read text is searched for the prompt
+    output = ''
+    found = scan = 0
+    start = last_data = time.monotonic()
+    while found < len(commands):
+        now = time.monotonic()
+        # idle timer restarts with every chunk; the overall bound only guards against a never-ending stream
+        if now - last_data > BATCH_IDLE_TIMEOUT or now - start > COMMAND_READ_TIMEOUT * len(commands):
+            raise ReadTimeout(f"{net_connect.host}: prompt came back {found} of {len(commands)} times")
+        data = net_connect.read_channel()
+        if not data:
+            time.sleep(0.01)
+            continue
+        last_data = now
+        output += data
+        while found < len(commands) and (i := output.find(prompt, scan)) >= 0:
+            found += 1
+            scan = i + len(prompt)
+        # a prompt may be cut between two reads, keep its start in the next search
+        scan = max(scan, len(output) - len(prompt) + 1)
+    prompt_re = re.escape(prompt)
+    # "<echo of cmd1>\n<output1>\n<prompt><echo of cmd2>\n<output2>\n<prompt>..."
+    chunks = re.split(prompt_re, output.replace('\r', ''))
+    if len(chunks) != len(commands) + 1 or chunks[-1].strip():
+        return None
+    raws = {}
+    for cmd, chunk in zip(commands, chunks):
+        echo, _, raw = chunk.lstrip('\n').partition('\n')
+        if echo.strip() != cmd:
+            return None
+        raws[cmd] = raw.rstrip('\n')
+    return raws
+
+def send_show_commands(net_connect, cmds_for, platform):
+    """
+    Sends every command of cmds_for over the open session and returns {key: output}.
+      - A command shared by two keys (ex: aruba/hp 'show interfaces brief') is sent only once.
+      - All commands are written in one batch (send_batched). If that output can't be split per command or the
+        prompt doesn't come back in time, the channel is drained and resynced and they are sent one by one with the prompt found once as expect_string (without it netmiko runs
+        find_prompt() before every command, an extra round-trip).
+      - TextFSM parsing runs in a helper thread; one by one, parsing command K overlaps the read of command K+1.
+      - 'lag' is optional, its failure gives None instead of aborting the collection.
+    """
+    prompt = net_connect.find_prompt()
+    by_command = {}
+    with ThreadPoolExecutor(max_workers=1) as parser:
+        try:
+            raws = send_batched(net_connect, list(dict.fromkeys(cmds_for.values())), prompt)
+        except ReadTimeout as e:
+            log.debug("%s", e)
+            raws = None
+        if raws is not None:
+            by_command = {cmd: parser.submit(parse_output, platform, cmd, raw) for cmd, raw in raws.items()}
+        else:
+            log.debug("%s: batched output couldn't be split, sending commands one by one", net_connect.host)
+            # the rest of the batch may still be coming (read stopped at a prompt inside an output);
+            # drain it and resync on the prompt, or the first command would read stale output
+            net_connect.clear_buffer()
+            net_connect.find_prompt()
+            expect_string = re.escape(prompt)
+            for key, cmd in cmds_for.items():
+                if cmd in by_command:
+                    continue
+                try:
+                    raw = net_connect.send_command(cmd, expect_string=expect_string, read_timeout=COMMAND_READ_TIMEOUT)
+                except Exception:
+                    if key != 'lag':
+                        raise
+                    by_command[cmd] = None
+                    continue
+                by_command[cmd] = parser.submit(parse_output, platform, cmd, raw)
+        parsed = {cmd: None if future is None else future.result() for cmd, future in by_command.items()}
+    return {key: parsed[cmd] for key, cmd in cmds_for.items()}
+
+# ------------------ detected platform cache ---------------------------------
+_PLATFORM_CACHE_LOCK = threading.Lock()
+
+def _load_platform_cache():
+    try:
+        with open(PLATFORM_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_PLATFORM_CACHE = _load_platform_cache()
+
+def cached_platform(ip):
+    """device_type detected earlier for ip, None if unknown or too old."""
+    entry = _PLATFORM_CACHE.get(ip)
+    if entry and time.time() - entry[1] < PLATFORM_CACHE_MAX_AGE:
+        return entry[0]
+    return None
+
+def _save_platform_cache():
+    # written to a temp file and renamed, so a crash never leaves a truncated cache behind
+    tmp = PLATFORM_CACHE_PATH + '.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(_PLATFORM_CACHE, f)
+        os.replace(tmp, PLATFORM_CACHE_PATH)
+    except OSError as e:
+        log.debug("Platform cache couldn't be saved: %s", e)
+
+def remember_platform(ip, platform):
+    with _PLATFORM_CACHE_LOCK:
+        _PLATFORM_CACHE[ip] = [platform, time.time()]
+        _save_platform_cache()
+
+def forget_platform(ip):
+    with _PLATFORM_CACHE_LOCK:
+        if _PLATFORM_CACHE.pop(ip, None) is not None:
+            _save_platform_cache()
+
+# ------------------ Netmiko session pool ------------------------------------
+# (host, username, password, device_type) -> (net_connect, last_used). A session is checked out while in use,
+# so two workers never share one channel. The password is part of the key: a target with other (wrong)
+# credentials must authenticate itself instead of getting a channel someone else logged in.
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+_reaper = None
+
+def _disconnect_quietly(net_connect):
+    try:
+        net_connect.disconnect()
+    except Exception:
+        pass
+
+def _session_key(dev):
+    return (dev['host'], dev['username'], dev['password'], dev['device_type'])
+
+def get_session(dev):
+    """Returns a live pooled session for dev if there is one, otherwise opens a new one."""
+    with _SESSIONS_LOCK:
+        entry = _SESSIONS.pop(_session_key(dev), None)
+    if entry:
+        net_connect = entry[0]
+        if net_connect.is_alive():
+            log.debug("%s: reusing pooled session", dev['host'])
+            return net_connect
+        _disconnect_quietly(net_connect)
+    return ConnectHandler(**dev)
+
+def release_session(dev, net_connect):
+    """Puts a healthy session back into the pool."""
+    global _reaper
+    with _SESSIONS_LOCK:
+        previous = _SESSIONS.get(_session_key(dev))
+        _SESSIONS[_session_key(dev)] = (net_connect, time.monotonic())
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap_idle_sessions, name='session-reaper', daemon=True)
+            _reaper.start()
+    if previous and previous[0] is not net_connect:
+        _disconnect_quietly(previous[0])
+
+def _reap_idle_sessions():
+    while True:
+        time.sleep(60)
+        now = time.monotonic()
+        with _SESSIONS_LOCK:
+            idle = [key for key, (_, last_used) in _SESSIONS.items() if now - last_used > SESSION_IDLE_TIMEOUT]
+            expired = [_SESSIONS.pop(key)[0] for key in idle]
+        for net_connect in expired:
+            _disconnect_quietly(net_connect)
+
+def close_all_sessions():
+    with _SESSIONS_LOCK:
+        sessions = [net_connect for net_connect, _ in _SESSIONS.values()]
+        _SESSIONS.clear()
+    for net_connect in sessions:
+        _disconnect_quietly(net_connect)
+
+atexit.register(close_all_sessions)
+
+@contextmanager
+def pooled_session(dev):
+    """Like `with ConnectHandler(**dev)`, but the session goes back to the pool instead of being closed."""
+    net_connect = get_session(dev)
+    try:
+        yield net_connect
+    except Exception:
+        # state of the channel is unknown after an error, don't reuse it
+        _disconnect_quietly(net_connect)
+        raise
+    release_session(dev, net_connect)
+
 # ------------------ SwitchManager (özetlenmiş) -------------------------------
 class SwitchManager:
-    def __init__(self, ip, username, password, excel_dosyasi, platform=None, prefer_napalm=True):
+    def __init__(self, ip, username, password, platform=None, prefer_napalm=True):
         self.ip = ip
         self.username = username
         self.password = password
         self.platform = platform  # netmiko device_type / napalm driver name
         self.prefer_napalm = prefer_napalm and NAPALM_AVAILABLE
-        self.excel = excel_dosyasi
+        self.platform_detected = False  # platform came from SSHDetect / the platform cache, not the user
 
-        self.toplanan_veriler = []
-        self.vlan_verileri = []
+        # struct-of-arrays: one list per sheet column instead of one dict per row
+        self.toplanan_veriler = new_columns('Interface_Information')
+        self.vlan_verileri = new_columns('VLAN_List')
         self.hostname = 'unknown'
 
+    # Netmiko sessions are pooled across SwitchManager instances; also closed at exit (atexit)
+    close_pool = staticmethod(close_all_sessions)
+
+    def add_interface(self, port, status, protocol, ip_address, vlan, description, etherchannel):
+        cols = self.toplanan_veriler
+        cols['Hostname'].append(self.hostname)
+        cols['Port'].append(port)
+        cols['Description'].append(description)
+        cols['Vlan'].append(vlan)
+        cols['Status'].append(status)
+        cols['Protocol'].append(protocol)
+        cols['Ip_address'].append(ip_address)
+        cols['Etherchannel'].append(etherchannel)
+
+    def add_vlan(self, vlan_id, vlan_name, ports):
+        cols = self.vlan_verileri
+        cols['Hostname'].append(self.hostname)
+        cols['Vlan_id'].append(vlan_id)
+        cols['Vlan Name'].append(vlan_name)
+        cols['Atanan_portlar'].append(ports)
+
+    def run(self):
+        """Collects the switch data and returns (toplanan_veriler, vlan_verileri) as {column: values} dicts."""
         ok = self.run_collection()
-        if ok and self.toplanan_veriler:
-            self.export_to_excel()
-        elif ok and not self.toplanan_veriler:
-            print("-> Connection established but no interface data found.")
-        else:
-            print("-> Connection couldn't establilshed .")
+        if self.platform_detected:
+            # keep a detection that worked for the next run, drop one that led to a failed collection
+            if ok:
+                remember_platform(self.ip, self.platform)
+            else:
+                forget_platform(self.ip)
+        if ok and not self.toplanan_veriler['Port']:
+            print(f"-> {self.ip}: Connection established but no interface data found.")
+        elif not ok:
+            print(f"-> {self.ip}: Connection couldn't establilshed .")
+        return self.toplanan_veriler, self.vlan_verileri
 
     # Tries SSHDetect to detect platform
     def detect_platform(self):
@@ -142,22 +511,31 @@ class SwitchManager:
         if self.platform:
             return self.platform
 
+        # detected on an earlier run: skips the SSHDetect probe session
+        cached = cached_platform(self.ip)
+        if cached:
+            log.debug("%s: platform from cache: %s", self.ip, cached)
+            self.platform = cached
+            self.platform_detected = True
+            return cached
+
         # SSHDetect kullanarak auto-detect denemesi (Netmiko). Bazen hatalı olabilir.
         device = {"device_type": "autodetect", "host": self.ip, "username": self.username, "password": self.password}
         try:
             guesser = SSHDetect(**device)
             best_match = guesser.autodetect()   # burada best_match cisco_ios juniper_junos gibi değerler döndürür platform belirlenir.
-            print(f"SSHDetect result: {best_match}")
+            log.debug("%s: SSHDetect result: %s", self.ip, best_match)
             self.platform = best_match
+            self.platform_detected = best_match is not None
             return best_match
         except Exception as e:
-            print("Platform couldn't identified:", e)
+            log.warning("%s: Platform couldn't identified: %s", self.ip, e)
             return None
 
     def run_collection(self):
         # 1) platform tespiti
         platform = self.detect_platform()
-        print("Platform in use :", platform)
+        log.info("%s: Platform in use : %s", self.ip, platform)
 
         # Platform attribute must be fixed from now
 
@@ -180,7 +558,7 @@ class SwitchManager:
                     device = driver(hostname=self.ip, username=self.username, password=self.password, optional_args=optional_args)
                     # device objesi ise bir bağlantı başlatmaya ve parametrelerin verilmesi işine yarıyor.
                     device.open()
-                    print("NAPALM in use")
+                    log.debug("%s: NAPALM in use", self.ip)
                     facts = device.get_facts()
                     self.hostname = facts.get('hostname', self.ip)
                     # get interfaces + ips + vlans (varsa)
@@ -192,6 +570,17 @@ class SwitchManager:
                         vlans = device.get_vlans()
                     except Exception:
                         vlans = {}
+                    # reverse index: member port (raw and normalized name) -> (vlan position, vlan id);
+                    # the earliest vlan wins, like a scan over vlans.items() would.
+                    # A vlan's label is built once here and shared by all its member ports.
+                    port_to_vlan = {}
+                    vlan_label = {}
+                    for i, (vid, vobj) in enumerate(vlans.items()):
+                        vlan_label[vid] = f"{vid}({vobj.get('name')})"
+                        for p in vobj.get('interfaces') or []:
+                            port_to_vlan.setdefault(p, (i, vid))
+                            port_to_vlan.setdefault(normalize_interface_names(p, vendor=platform), (i, vid))
+                    vlans_added = set()
                     # her interface için interface detayları ve meta datarrı almaya çalışıyoruz.
                     for ifname, meta in interfaces.items():
                         normalized = normalize_interface_names(ifname, vendor=platform)
@@ -202,215 +591,286 @@ class SwitchManager:
                             # ipv4 dict varsa
                             ipv4 = ip_addr.get('ipv4') or {}
                             if ipv4:
-                                ip_str = ','.join(list(ipv4.keys()))
+                                ip_str = ','.join(ipv4)
                         # eğer meta.get ile is_up alabiliyorsan bir interfaceden bu up olsun direkt. Diğer türlü de down olsun.
                         status = 'up' if meta.get('is_up') else 'down'
                         description = meta.get('description', ' - ')
                         # vlan lookup (napalm get_vlans returns mapping vlan_id -> {name, interfaces})
                         vlan_info = ' - '
-                        for vid, vobj in vlans.items():
-                            ints = vobj.get('interfaces') or []
-                            if ifname in ints or normalized in ints:
-                                vlan_info = f"{vid}({vobj.get('name')})"
-                                self.vlan_verileri.append({
-                                    'Hostname': self.hostname,
-                                    'Vlan_id': vid,
-                                    'Vlan Name': vobj.get('name'),
-                                    'Atanan_portlar': ', '.join(ints)
-                                })
-                                break
-                        self.toplanan_veriler.append({
-                            "Hostname": self.hostname,
-                            "Port": normalized,
-                            "Status": status,
-                            "Protocol": meta.get('is_enabled', ' - '),
-                            "Ip_address": ip_str or ' - ',
-                            "Vlan": vlan_info,
-                            "Description": description,
-                            "Etherchannel": ' - '
-                        })
+                        hit = min(filter(None, (port_to_vlan.get(ifname), port_to_vlan.get(normalized))), default=None)
+                        if hit:
+                            vid = hit[1]
+                            vlan_info = vlan_label[vid]
+                            # vlan sheet gets one row per vlan (member list joined once), not one per member port
+                            if vid not in vlans_added:
+                                vlans_added.add(vid)
+                                vobj = vlans[vid]
+                                self.add_vlan(vid, vobj.get('name'), ', '.join(vobj.get('interfaces') or []))
+                        self.add_interface(normalized, status, str(meta.get('is_enabled', ' - ')), ip_str or ' - ',
+                                           vlan_info, description, ' - ')
 
                     device.close()
-                    print("Napalm successful.")
+                    log.info("%s: Napalm successful.", self.ip)
                     return True
                 except Exception as e:
-                    print("Napalm not successful , trying Netmiko:", e)
+                    log.info("%s: Napalm not successful , trying Netmiko: %s", self.ip, e)
                     # fallback Netmiko'ya devam edeceğiz
 
         # 3) Netmiko flow (fallback / or directly if prefer_napalm is False)
         try:
-            print("Netmiko flow is running")
+            log.debug("%s: Netmiko flow is running", self.ip)
             dev = {"device_type": platform, "host": self.ip,
                    "username": self.username, "password": self.password,
-                   "global_delay_factor": 2}
-            with ConnectHandler(**dev) as net_connect:
+                   "keepalive": SESSION_KEEPALIVE}
+            with pooled_session(dev) as net_connect:
                 self.hostname = net_connect.base_prompt
                 used_platform = platform or dev['device_type']
                 cmds_for = COMMANDS.get(used_platform)
 
+                # aynı port ismi 5 komut çıktısında da geçiyor, her isim bu oturumda bir kez normalize edilir
+                norm_cache = {}
+                def norm(port):
+                    normalized = norm_cache.get(port)
+                    if normalized is None:
+                        normalized = norm_cache[port] = normalize_interface_names(port, vendor=used_platform)
+                    return normalized
+
+                # all show commands go over this one session with a single prompt discovery
+                outputs = send_show_commands(net_connect, cmds_for, used_platform)
+
                 # 1 - interfaces
-                out_if = net_connect.send_command(cmds_for['interfaces'], use_textfsm=True)
+                out_if = outputs['interfaces']
                 # out_if is often list of dicts when TF exists, else raw str
-                parsed_if_list = []     # buraya tek tek cihazdaki tüm interface isimleri gelir
                 if isinstance(out_if, list):
-                    parsed_if_list = out_if
+                    parsed_if_list = out_if     # buraya tek tek cihazdaki tüm interface isimleri gelir
                 else:
-                    # fallback rudimentary parse
-                    for line in str(out_if).splitlines():
-                        if line.strip() and not line.lower().startswith('interface'):
-                            # brute force: split by whitespace
-                            parts = line.split()
-                            if len(parts) >= 1:
-                                parsed_if_list.append({"interface": parts[0], "ip_address": parts[1] if len(parts) > 1 else ' - '})
+                    # fallback rudimentary parse: first two whitespace separated columns of each line.
+                    # maxsplit=2 leaves the rest of the line unsplit; status columns like
+                    # 'administratively down' contain spaces, so a fixed-column parse (read_csv sep=r'\s+') can't be used.
+                    parsed_if_list = [{"interface": parts[0], "ip_address": parts[1] if len(parts) > 1 else ' - '}
+                                      for line in str(out_if).splitlines()
+                                      if (parts := line.split(None, 2)) and not line.lower().startswith('interface')]
                 # descriptions
-                out_desc = net_connect.send_command(cmds_for['descriptions'], use_textfsm=True)
+                out_desc = outputs['descriptions']
                 parsed_desc = out_desc if isinstance(out_desc, list) else []
                 # switchport/vlan
-                out_sw = net_connect.send_command(cmds_for['switchport'], use_textfsm=True) if 'switchport' in cmds_for else []
+                out_sw = outputs.get('switchport', [])
                 parsed_sw = out_sw if isinstance(out_sw, list) else []
                 # lag
-                out_lag = None
-                if 'lag' in cmds_for:
-                    try:
-                        out_lag = net_connect.send_command(cmds_for['lag'], use_textfsm=True)
-                    except Exception:
-                        out_lag = None
+                out_lag = outputs.get('lag')
                 # vlan brief
-                out_vlans = net_connect.send_command(cmds_for['vlans'], use_textfsm=True) if 'vlans' in cmds_for else []
+                out_vlans = outputs.get('vlans', [])
                 parsed_vlans = out_vlans if isinstance(out_vlans, list) else []
 
-                # Build interface_details dict (vendor-agnostic)
-                interface_details = {}
-                for iface in parsed_if_list:
-                    # keys differ between templates; try common ones
-                    port = iface.get('interface') or iface.get('port') or iface.get('intf') or iface.get('name')
-                    if not port: continue
-                    normalized = normalize_interface_names(port, vendor=used_platform)
-                    interface_details[normalized] = {
-                        "ip_address": iface.get('ip_address') or iface.get('ip') or ' - ',
-                        "status": iface.get('status') or iface.get('oper') or ' - ',
-                        "protocol": iface.get('proto') or iface.get('protocol') or ' - ',
-                        "description": " - ",
-                        "vlan": " - ",
-                        "etherchannel": " - "
-                    }
-                # fill description
-                for d in parsed_desc:
-                    port = d.get('port') or d.get('interface') or d.get('name')
-                    if not port: continue
-                    normalized = normalize_interface_names(port, vendor=used_platform)
-                    if normalized in interface_details:
-                        # try a few keys for description
-                        interface_details[normalized]['description'] = d.get('description') or d.get('desc') or interface_details[normalized]['description']
-
-                # fill switchport/vlan info
-                for sw in parsed_sw:
-                    port = sw.get('interface') or sw.get('port') or sw.get('name')
-                    if not port: continue
-                    normalized = normalize_interface_names(port, vendor=used_platform)
-                    if normalized in interface_details:
-                        mode = sw.get('mode') or ''
-                        if 'access' in mode.lower():
-                            interface_details[normalized]['vlan'] = f"Access({sw.get('access_vlan','')})"
-                        elif 'trunk' in mode.lower():
-                            interface_details[normalized]['vlan'] = f"Trunk({sw.get('trunk_vlans','')})"
-                        else:
-                            # hp/aruba templates may have different keys - try a few
-                            if sw.get('vlan'):
-                                interface_details[normalized]['vlan'] = sw.get('vlan')
-
-                # fill etherchannel info roughly from out_lag if present
-                if out_lag and isinstance(out_lag, list):
-                    for g in out_lag:
-                        # try typical keys
-                        bundle = g.get('bundle_name') or g.get('group') or g.get('lag')
-                        members = g.get('member_interface') or g.get('members') or []
-                        for m in members:
-                            nm = normalize_interface_names(m, vendor=used_platform)
-                            if nm in interface_details:
-                                interface_details[nm]['etherchannel'] = bundle
+                # Each source becomes a lookup table keyed by normalized port (later rows win, as before),
+                # then a single pass left-joins them onto the interface list. Template field names differ,
+                # first_of() tries the common ones.
+                interfaces = {norm(port): iface for iface in parsed_if_list
+                              if (port := first_of(iface, ('interface', 'port', 'intf', 'name')))}
+
+                desc_by_port = {norm(port): description for d in parsed_desc
+                                if (port := first_of(d, ('port', 'interface', 'name')))
+                                and (description := first_of(d, ('description', 'desc')))}
 
+                # switchport/vlan info
+                vlan_by_port = {norm(port): label for sw in parsed_sw
+                                if (port := first_of(sw, ('interface', 'port', 'name')))
+                                and (label := switchport_vlan(sw))}
+                # vlan brief membership overrides the switchport info; the same pass fills the VLAN sheet,
+                # so each member list is normalized and joined once
                 for v in parsed_vlans:
                     # many templates provide 'interfaces' list or 'ports'
-                    ports = v.get('interfaces') or v.get('ports') or v.get('assigned_ports') or []
-                    for p in ports:
-                        nm = normalize_interface_names(p, vendor=used_platform)
-                        # reverse-lookup interface to add vlan string (simple)
-                        if nm in interface_details:
-                            interface_details[nm]['vlan'] = f"{v.get('vlan_id') or v.get('vlan') or v.get('vlan_id','') }({v.get('vlan_name') or v.get('name','')})"
-
-                # convert to top-level list
-                for port, det in interface_details.items():
-                    self.toplanan_veriler.append({
-                        "Hostname": self.hostname,
-                        "Port": port,
-                        "Status": det["status"],
-                        "Protocol": det["protocol"],
-                        "Ip_address": det["ip_address"],
-                        "Vlan": det["vlan"],
-                        "Description": det["description"],
-                        "Etherchannel": det["etherchannel"]
-                    })
-                # VLAN sheet
-                for v in parsed_vlans:
-                    ports = v.get('interfaces') or v.get('ports') or []
-                    norm_ports = [normalize_interface_names(p, vendor=used_platform) for p in ports]
-                    self.vlan_verileri.append({
-                        'Hostname': self.hostname,
-                        'Vlan_id': v.get('vlan_id') or v.get('vlan') or v.get('id'),
-                        'Vlan Name': v.get('vlan_name') or v.get('name'),
-                        'Atanan_portlar': ', '.join(norm_ports)
-                    })
+                    ports = [norm(p) for p in first_of(v, ('interfaces', 'ports', 'assigned_ports')) or []]
+                    # juniper's template calls the vlan id 'tag'
+                    vid = first_of(v, ('vlan_id', 'vlan', 'id', 'tag'))
+                    label = f"{vid or ''}({v.get('vlan_name') or v.get('name','')})"
+                    vlan_by_port.update(dict.fromkeys(ports, label))
+                    self.add_vlan(vid,
+                                  first_of(v, ('vlan_name', 'name')),
+                                  ', '.join(ports))
+
+                # etherchannel info roughly from out_lag if present
+                lag_by_port = {}
+                if out_lag and isinstance(out_lag, list):
+                    for g in out_lag:
+                        bundle = first_of(g, ('bundle_name', 'group', 'lag'))
+                        members = first_of(g, ('member_interface', 'members')) or []
+                        lag_by_port.update(dict.fromkeys(map(norm, members), bundle))
+
+                for port, iface in interfaces.items():
+                    self.add_interface(port,
+                                       iface.get('status') or iface.get('oper') or ' - ',
+                                       iface.get('proto') or iface.get('protocol') or ' - ',
+                                       iface.get('ip_address') or iface.get('ip') or ' - ',
+                                       vlan_by_port.get(port, ' - '),
+                                       desc_by_port.get(port, ' - '),
+                                       lag_by_port.get(port, ' - '))
                 return True
 
         except NetmikoTimeoutException:
-            print("Zaman aşımı:", self.ip)
+            log.error("Zaman aşımı: %s", self.ip)
             return False
         except NetmikoAuthenticationException:
-            print("Auth error:", self.ip)
+            log.error("Auth error: %s", self.ip)
             return False
         except Exception as e:
-            print("Unexpected error:", e)
+            log.error("%s: Unexpected error: %s", self.ip, e)
             return False
 
-    def export_to_excel(self):
-        print("Writing to excel:", self.excel)
-        yeni_arayuz_df = pd.DataFrame(self.toplanan_veriler)
-        yeni_vlan_df = pd.DataFrame(self.vlan_verileri)
-        cols_ar = ['Hostname', 'Port', 'Description', 'Vlan', 'Status', 'Protocol', 'Ip_address', 'Etherchannel']
-        cols_vlan = ['Hostname', 'Vlan_id', 'Vlan Name', 'Atanan_portlar']
-        yeni_arayuz_df = yeni_arayuz_df.reindex(columns=cols_ar)
-        yeni_vlan_df = yeni_vlan_df.reindex(columns=cols_vlan)
+# ------------------ collection / store / export ----------------------------
+def store_path(excel):
+    # kalıcı kayıt sqlite'ta tutulur, excel bu veritabanından üretilen bir çıktıdır.
+    return os.path.splitext(excel)[0] + '.db'
+
+def _sql_columns(cols):
+    return ', '.join(f'"{c}"' for c in cols)
+
+def open_store(excel):
+    """
+    Opens (creates) the sqlite store next to the workbook: one table per sheet, keyed like the sheet.
+    A new store is seeded once from an existing workbook so earlier results are kept.
+    """
+    path = store_path(excel)
+    is_new = not os.path.exists(path)
+    con = sqlite3.connect(path)
+    with con:
+        for sheet, table in SHEET_TABLES.items():
+            keys = SHEET_KEYS[sheet]
+            con.execute(f'CREATE TABLE IF NOT EXISTS {table} ('
+                        + ', '.join(f'"{c}" TEXT NOT NULL' if c in keys else f'"{c}" TEXT' for c in SHEET_COLUMNS[sheet])
+                        + f', PRIMARY KEY ({_sql_columns(keys)}))')
+            # stores created before the NOT NULL: NULL keys never collide, so repeated runs piled up copies
+            # of the same row; folding them onto '' keeps only the last one
+            for key in keys:
+                con.execute(f'UPDATE OR REPLACE {table} SET "{key}" = \'\' WHERE "{key}" IS NULL')
+    if is_new and os.path.exists(excel):
+        print("Importing existing excel into", path)
         try:
-            mevcut = {}
+            # read-only workbook streams the rows, no DataFrame copy of the whole sheet
+            wb = openpyxl.load_workbook(excel, read_only=True)
             try:
-                mevcut = pd.read_excel(self.excel, sheet_name=None)
-            except FileNotFoundError:
-                mevcut = {}
-            mevcut_ar = mevcut.get('Interface_Information', pd.DataFrame())
-            mevcut_vlan = mevcut.get('VLAN_List', pd.DataFrame())
-            merged_ar = pd.concat([mevcut_ar, yeni_arayuz_df], ignore_index=True)
-            merged_vlan = pd.concat([mevcut_vlan, yeni_vlan_df], ignore_index=True)
-            merged_ar.drop_duplicates(subset=['Hostname', 'Port'], keep='last', inplace=True)
-            merged_vlan.drop_duplicates(subset=['Hostname', 'Vlan_id'], keep='last', inplace=True)
-            with pd.ExcelWriter(self.excel, engine='openpyxl') as writer:
-                merged_ar.to_excel(writer, sheet_name='Interface_Information', index=False)
-                merged_vlan.to_excel(writer, sheet_name='VLAN_List', index=False)
-            print("Excel up to date.")
-        except Exception as e:
-            print("Excel writing error:", e)
+                for sheet in SHEET_TABLES:
+                    if sheet in wb.sheetnames:
+                        insert_rows(con, sheet, iter_sheet_rows(wb[sheet], SHEET_COLUMNS[sheet]))
+            finally:
+                wb.close()
+        except Exception:
+            # don't leave a half-seeded store behind, the next export would drop the old rows
+            con.close()
+            os.remove(path)
+            raise
+    return con
+
+def iter_sheet_rows(ws, cols):
+    """Rows of a worksheet as tuples in cols order (missing column/empty cell -> None, other cells as text)."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, ())
+    idx = [header.index(c) if c in header else None for c in cols]
+    for row in rows:
+        if all(v is None for v in row):
+            continue
+        yield tuple(None if i is None or i >= len(row) or row[i] is None else str(row[i]) for i in idx)
+
+def store_rows(con, sheet, columns):
+    """INSERT OR REPLACE one switch's {column: values} into the sheet's table, in one transaction."""
+    insert_rows(con, sheet, zip(*(columns[c] for c in SHEET_COLUMNS[sheet])))
+
+def insert_rows(con, sheet, rows):
+    """INSERT OR REPLACE row tuples (SHEET_COLUMNS order) into the sheet's table, in one transaction."""
+    cols = SHEET_COLUMNS[sheet]
+    key_idx = [cols.index(k) for k in SHEET_KEYS[sheet]]
+    # last write wins inside the batch as well (ex: napalm repeats a vlan row per member port),
+    # so a repeated key costs a dict assignment instead of a sqlite delete + insert
+    keyed = {}
+    for row in rows:
+        if any(row[i] is None for i in key_idx):
+            # a missing key part (ex: a vlan row without id) is stored as '', a NULL key would never be replaced
+            row = tuple('' if v is None and i in key_idx else v for i, v in enumerate(row))
+        keyed[tuple(row[i] for i in key_idx)] = row
+    with con:
+        con.executemany(f'INSERT OR REPLACE INTO {SHEET_TABLES[sheet]} ({_sql_columns(cols)}) '
+                        f'VALUES ({", ".join("?" * len(cols))})', keyed.values())
+
+def collect_many(targets, con, workers=MAX_WORKERS):
+    """
+    Her hedef (SwitchManager kwargs dict'i) için toplama işini thread pool'a dağıtır.
+    Her SwitchManager kendi listelerini tuttuğu için paylaşılan state yok; biten her switch ana thread'de store'a yazılır.
+    The main thread is the single writer: a switch is stored as soon as it finishes (not in input order),
+    so the writes overlap the collections still running.
+    Returns the number of switches that produced interface data.
+    """
+    if not targets:
+        return 0
+    collected = 0
+    with ThreadPoolExecutor(max_workers=min(workers, len(targets))) as ex:
+        futures = {ex.submit(SwitchManager(**cfg).run): cfg['ip'] for cfg in targets}
+        for future in as_completed(futures):
+            try:
+                toplanan_veriler, vlan_verileri = future.result()
+            except Exception as e:
+                # one broken switch must not drop the results of the others
+                log.error("%s: Unexpected error: %s", futures[future], e)
+                continue
+            if toplanan_veriler['Port']:
+                store_rows(con, 'Interface_Information', toplanan_veriler)
+                store_rows(con, 'VLAN_List', vlan_verileri)
+                collected += 1
+    return collected
+
+def export_to_excel(excel, con):
+    """Streams the whole store to the workbook in a single pass."""
+    print("Writing to excel:", excel)
+    try:
+        # workbook is always rewritten from scratch: rows go from the sqlite cursor straight to xlsxwriter,
+        # and constant_memory flushes each row as the next one starts, so memory stays flat whatever the store size
+        with xlsxwriter.Workbook(excel, {'constant_memory': True}) as wb:
+            header_format = wb.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+            for sheet, table in SHEET_TABLES.items():
+                ws = wb.add_worksheet(sheet)
+                cols = SHEET_COLUMNS[sheet]
+                ws.write_row(0, 0, cols, header_format)
+                convert = [(i, EXPORT_TYPES[c]) for i, c in enumerate(cols) if c in EXPORT_TYPES]
+                rows = con.execute(f'SELECT {_sql_columns(cols)} FROM {table} ORDER BY rowid')
+                for r, row in enumerate(rows, start=1):
+                    if convert:
+                        row = list(row)
+                        for i, to_type in convert:
+                            row[i] = to_type(row[i])
+                    ws.write_row(r, 0, row)
+        print("Excel up to date.")
+    except Exception as e:
+        # the store still has everything, the next export rewrites the workbook
+        print("Excel writing error:", e)
 
 if __name__ == '__main__':
 
     excel = 'switch_info.xlsx'
+    # root stays at WARNING: paramiko logs every SSH connect/auth at INFO, without the switch IP
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    log.setLevel(logging.INFO)  # DEBUG for detailed per-device flow
 
     clear_screen()
     display_banner()
     print("")
+    # opened before asking for the targets, so an import problem shows up before any credentials are typed
+    try:
+        store = open_store(excel)
+    except Exception as e:
+        # the unreadable workbook is left as it is; this run gets a fresh store and workbook of its own
+        failed, excel = excel, os.path.splitext(excel)[0] + '_new.xlsx'
+        log.error("Existing excel %s couldn't be imported (%s), results of this run go to %s", failed, e, excel)
+        store = open_store(excel)
+
+    # changes made while opening (import of an existing workbook) alone don't call for a rewrite
+    changes_at_open = store.total_changes
+
+    targets = []
     while True:
         platform = None
-        platform_input = input("Enter the Device type (ex: ciso, juniper, aruba, hp, autodetect \nFor (q) to quit :").strip() or None
-        if "cisco" in platform_input:
+        platform_input = input("Enter the Device type (ex: ciso, juniper, aruba, hp, autodetect \nFor (q) to quit and start collection :").strip()
+        if platform_input == 'q' or platform_input == 'Q':
+            break
+        elif "cisco" in platform_input:
             platform = "cisco_ios"
         elif "juniper" in platform_input:
             platform = "juniper_junos"
@@ -418,12 +878,19 @@ if __name__ == '__main__':
             platform = "aruba_os"
         elif "hp" in platform_input:
             platform = "hp_procurve"
-        elif platform_input == 'q' or platform_input=='Q':
-            break
         else:
             print("No switch type is found")
         ip = input("Switch IP/hostname: ")
         username = input("Username: ")
         password = getpass("Password: ")
         prefer_napalm = True # Make it false if you don't want to use Napalm
-        SwitchManager(ip, username, password, excel, platform=platform, prefer_napalm=prefer_napalm)
+        targets.append(dict(ip=ip, username=username, password=password, platform=platform, prefer_napalm=prefer_napalm))
+
+    try:
+        if targets and not collect_many(targets, store):
+            print("-> No interface data collected, excel not updated.")
+    finally:
+        # also after an interrupted run: whatever this run put into the store goes to the workbook
+        if store.total_changes > changes_at_open:
+            export_to_excel(excel, store)
+        store.close()